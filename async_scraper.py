@@ -0,0 +1,99 @@
+"""
+async_scraper.py
+
+Async Google Maps grid POI scraper built on Playwright.
+Keeps many searches in flight on one event loop (one shared browser
+context) instead of rendering a single page at a time with Selenium.
+HTML parsing runs in a process pool so it overlaps with network I/O.
+
+Requires: pip install playwright lxml numpy selenium && playwright install chromium
+(selenium is only imported, via scraper.py, for the shared parser)
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import config
+import utils
+from scraper import parse_left_panel_pois, build_rows, build_tasks
+
+HEADER = ["Name", "Rating", "Number of Reviews", "Latitude", "Longitude", "Search Query", "CenterLat", "CenterLon", "Distance_m"]
+
+async def fetch(context, semaphore, pool, query, lat, lon, take_screenshot=False, row_idx=None, col_idx=None):
+    """Load one search page and return its CSV rows."""
+    async with semaphore:
+        page = await context.new_page()
+        try:
+            await page.goto(utils.build_search_url(query, lat, lon), wait_until="domcontentloaded")
+            try:
+                await page.wait_for_selector("div.Nv2PK", timeout=config.PAUSE_AFTER_LOAD * 1000)
+            except PlaywrightTimeoutError:
+                pass  # No cards rendered; parser falls back to place links
+
+            if take_screenshot:
+                try:
+                    fname = f"shot_r{row_idx}_c{col_idx}_{query.replace(' ', '_')}_{lat:.6f}_{lon:.6f}.jpg"
+                    await page.screenshot(path=os.path.join(config.PER_CATEGORY_DIR, fname),
+                                          type="jpeg", quality=config.SCREENSHOT_QUALITY)
+                except Exception as e:
+                    print(f"Screenshot failed: {e}")
+
+            html = await page.content()
+        finally:
+            await page.close()
+
+    # Parse off the event loop so other pages keep loading
+    loop = asyncio.get_running_loop()
+    pois = await loop.run_in_executor(pool, parse_left_panel_pois, html, config.NUM_RESULTS_PER_SEARCH)
+    return build_rows(pois, query, lat, lon)
+
+async def fetch_task(context, semaphore, pool, task):
+    """Run one grid task, returning (task, rows); failures are logged and yield no rows."""
+    row, col, lat, lon, cat, subcat, _ = task
+    try:
+        rows = await fetch(context, semaphore, pool, subcat, lat, lon,
+                           take_screenshot=config.TAKE_SCREENSHOTS, row_idx=row, col_idx=col)
+    except Exception as e:
+        print(f"Error scraping '{subcat}' at ({row}, {col}): {e}")
+        rows = []
+    return task, rows
+
+async def run_async_scraper():
+    print("Initializing Async Scraper...")
+    utils.ensure_dirs()
+
+    if not os.path.exists(config.COMBINED_CSV):
+        utils.write_rows_to_csv(config.COMBINED_CSV, [], header=HEADER)
+
+    tasks = build_tasks()
+    semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_PAGES)
+    print(f"Queued {len(tasks)} searches ({config.MAX_CONCURRENT_PAGES} in flight)")
+
+    saved = 0
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=config.HEADLESS)
+        context = await browser.new_context(viewport={"width": 1920, "height": 1080})
+        try:
+            with ProcessPoolExecutor() as pool:
+                # Write each search's rows as soon as it finishes so an interrupted run keeps them
+                for done in asyncio.as_completed([fetch_task(context, semaphore, pool, task) for task in tasks]):
+                    (row, col, lat, lon, cat, subcat, out_path), rows = await done
+                    if not rows:
+                        continue
+
+                    utils.write_rows_to_csv(out_path, rows, header=HEADER)
+                    utils.write_rows_to_csv(config.COMBINED_CSV, rows)
+                    saved += len(rows)
+        finally:
+            await context.close()
+            await browser.close()
+
+    print(f"Scraping Completed! {saved} POIs saved.")
+
+if __name__ == "__main__":
+    asyncio.run(run_async_scraper())
+
+# auto-commit
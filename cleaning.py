@@ -0,0 +1,44 @@
+import os
+import pandas as pd
+import config
+
+def run_cleaner(input_file, output_file, parquet_file=None):
+    """Deduplicate and impute the scraped CSV at input_file, writing output_file (and parquet_file if given)."""
+    print(f"Reading from {input_file}...")
+    try:
+        df = pd.read_csv(input_file, dtype=config.CSV_DTYPES, na_values=config.CSV_NA_VALUES)
+    except FileNotFoundError:
+        print(f"Error: {input_file} not found. Run the scraper first.")
+        return
+
+    cols = ['Latitude', 'Longitude']
+    # Ensure numeric (non-numeric leftovers become NaN)
+    for col in cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    # Round so float noise doesn't defeat duplicate matching
+    df[cols] = df[cols].round(6)
+
+    print("Removing duplicates...")
+    initial_len = len(df)
+    df = df.drop_duplicates(subset=config.DEDUP_KEY, keep="first", ignore_index=True)
+    print(f"Removed {initial_len - len(df)} duplicate rows.")
+
+    print("Imputing missing Latitude/Longitude...")
+    missing = int(df[cols].isna().sum().sum())
+    df[cols] = df[cols].fillna(df[cols].mean())
+    print(f"Imputation information: Filled {missing} missing coordinate values with column mean.")
+
+    print(f"Saving cleaned data to {output_file}...")
+    df.to_csv(output_file, index=False)
+    if parquet_file:
+        # Parquet copy for the GUI: keeps dtypes and skips CSV text parsing
+        try:
+            df.to_parquet(parquet_file, compression="zstd", index=False)
+        except ImportError:
+            print("Warning: pyarrow/fastparquet not installed; skipping the Parquet copy.")
+            # The GUIs prefer Parquet, so don't leave an older copy shadowing the fresh CSV
+            if os.path.exists(parquet_file):
+                os.remove(parquet_file)
+    print("Cleaning Done.")
+
+# auto-commit
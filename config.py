@@ -5,12 +5,25 @@ OUTPUT_DIR = "Dataset"
 COMBINED_CSV = os.path.join(OUTPUT_DIR, "dataset.csv")
 PER_CATEGORY_DIR = os.path.join(OUTPUT_DIR, "categories")
 CLEAN_DATA_FILE = os.path.join(OUTPUT_DIR, "updated_dataset1.csv")
+CLEAN_PARQUET_FILE = os.path.join(OUTPUT_DIR, "updated_dataset1.parquet")
+
+# CSV read hints (numeric columns are coerced after reading: raw scrapes
+# contain stray header rows and icon glyphs in Rating)
+CSV_DTYPES = {"Name": "string", "Search Query": "category"}
+CSV_NA_VALUES = ["N/A", ""]
+
+# Columns identifying one POI result when removing duplicates
+DEDUP_KEY = ["Name", "Latitude", "Longitude", "Search Query"]
 
 # Scraper Settings
 TAKE_SCREENSHOTS = True   # Enabled by request
+SCREENSHOT_QUALITY = 60   # JPEG quality for CDP captures
 HEADLESS = False          # Set True to run without browser window
 PAUSE_AFTER_LOAD = 3      # Seconds to wait after searching
+MAX_WAIT = 10             # Max seconds to wait for the results panel
+NUM_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # Parallel Chrome drivers (headless when > 1)
 ZOOM = 15                 # Map zoom level
+MAX_CONCURRENT_PAGES = 32 # In-flight pages for async_scraper.py
 
 # Grid Area (Start/End Lat/Lon)
 START_LAT = 38.836359
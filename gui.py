@@ -1,23 +1,55 @@
 import streamlit as st
 import pandas as pd
-import folium
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 import os
 import config
+import mapviews
 
-# Use the cleaned data file
+# Use the cleaned data file (Parquet when the cleaner has produced it)
 DATA_FILE = config.CLEAN_DATA_FILE
+PARQUET_FILE = config.CLEAN_PARQUET_FILE
+
+MARKER_LIMIT = 50000 # Clustered markers; cap keeps the embedded data array reasonable
+
+@st.cache_data
+def load_data():
+    if os.path.exists(PARQUET_FILE):
+        df = pd.read_parquet(PARQUET_FILE)
+    elif os.path.exists(DATA_FILE):
+        df = pd.read_csv(DATA_FILE, dtype=config.CSV_DTYPES, na_values=config.CSV_NA_VALUES)
+    else:
+        return None
+    # Coerce once here so filter reruns never repeat it (handle non-numeric ratings if any)
+    df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(0.0).astype('float32')
+    # Lowercased Name|Search Query, so text search is one literal scan
+    df['_search_blob'] = (
+        df['Name'].astype('string').fillna('') + '|' +
+        df['Search Query'].astype('string').fillna('')
+    ).str.lower()
+    return df
+
+@st.cache_data
+def filter_df(df, search_term, min_rating):
+    """Apply the sidebar filters; cached per (search_term, min_rating)."""
+    filtered_df = df
+
+    # Filter by search
+    if search_term:
+        mask = filtered_df['_search_blob'].str.contains(search_term.lower(), regex=False, na=False)
+        filtered_df = filtered_df[mask]
+
+    # Filter by rating
+    return filtered_df[filtered_df['Rating'] >= min_rating]
+
+@st.cache_data
+def build_map(filtered_df, limit=MARKER_LIMIT):
+    """Build the Folium map for filtered_df and return it as HTML."""
+    return mapviews.render_map(filtered_df, limit=limit)._repr_html_()
 
 def run_gui():
     st.set_page_config(page_title="POI Map Explorer", layout="wide")
     st.title("🗺️ POI Map Explorer (Folium)")
 
-    @st.cache_data
-    def load_data():
-        if not os.path.exists(DATA_FILE):
-            return None
-        return pd.read_csv(DATA_FILE)
-
     df = load_data()
 
     if df is None:
@@ -34,19 +66,7 @@ def run_gui():
     min_rating = st.sidebar.slider("Min Rating", 0.0, 5.0, 0.0, 0.1)
 
     # Apply Filters
-    filtered_df = df.copy()
-    
-    # Filter by search
-    if search_term:
-        mask = (
-            filtered_df['Name'].str.contains(search_term, case=False, na=False) | 
-            filtered_df['Search Query'].str.contains(search_term, case=False, na=False)
-        )
-        filtered_df = filtered_df[mask]
-
-    # Filter by rating (handle non-numeric ratings if any)
-    filtered_df['Rating'] = pd.to_numeric(filtered_df['Rating'], errors='coerce').fillna(0)
-    filtered_df = filtered_df[filtered_df['Rating'] >= min_rating]
+    filtered_df = filter_df(df, search_term, min_rating)
 
     st.sidebar.markdown(f"**Results:** {len(filtered_df)}")
     if st.sidebar.button("Reload Data"):
@@ -55,44 +75,17 @@ def run_gui():
 
     # Main Display
     if not filtered_df.empty:
-        # Folium Map
-        avg_lat = filtered_df['Latitude'].mean()
-        avg_lon = filtered_df['Longitude'].mean()
-        
-        m = folium.Map(location=[avg_lat, avg_lon], zoom_start=12)
-
-        count = 0
-        limit = 1000 # Avoid crashing browser with too many markers
-        
-        for _, row in filtered_df.iterrows():
-            if count >= limit:
-                break
-                
-            popup_html = f"""
-            <div style="width:200px">
-                <b>{row['Name']}</b><br>
-                ⭐ {row['Rating']} ({row['Number of Reviews']})<br>
-                <i>{row['Search Query']}</i>
-            </div>
-            """
-            
-            folium.Marker(
-                [row['Latitude'], row['Longitude']],
-                popup=popup_html,
-                tooltip=row['Name']
-            ).add_to(m)
-            count += 1
-            
-        if len(filtered_df) > limit:
-            st.warning(f"Showing first {limit} markers only (performance limit).")
-
-        st_folium(m, width=1000, height=600)
+        # Folium Map (cached HTML, so unchanged filters skip marker construction)
+        components.html(build_map(filtered_df), width=1000, height=600)
+
+        if len(filtered_df) > MARKER_LIMIT:
+            st.warning(f"Showing first {MARKER_LIMIT} markers only (performance limit).")
     else:
         st.info("No POIs match your filters.")
 
     # Table
     with st.expander("Show Raw Data"):
-        st.dataframe(filtered_df)
+        st.dataframe(filtered_df.drop(columns='_search_blob'))
 
 if __name__ == "__main__":
     run_gui()
@@ -1,11 +1,13 @@
 import streamlit as st
 import pandas as pd
-import folium
 from streamlit_folium import st_folium
 import os
+import config
+import mapviews
 
 # Config
-DATA_FILE = os.path.join('Dataset', 'updated_dataset1.csv')
+DATA_FILE = config.CLEAN_DATA_FILE
+PARQUET_FILE = config.CLEAN_PARQUET_FILE
 
 st.set_page_config(page_title="POI Map Viewer", layout="wide")
 
@@ -13,6 +15,8 @@ st.title("📍 Google Maps POI Visualizer")
 
 @st.cache_data
 def load_data():
+    if os.path.exists(PARQUET_FILE):
+        return pd.read_parquet(PARQUET_FILE)
     if not os.path.exists(DATA_FILE):
         return None
     return pd.read_csv(DATA_FILE)
@@ -41,25 +45,8 @@ else:
 
     # Map
     if not filtered_df.empty:
-        # Center map on the average location of filtered results
-        avg_lat = filtered_df['Latitude'].mean()
-        avg_lon = filtered_df['Longitude'].mean()
-        
-        m = folium.Map(location=[avg_lat, avg_lon], zoom_start=13)
-
-        # Marker Cluster could be added, but keeping it simple for now
-        for _, row in filtered_df.iterrows():
-            popup_html = f"""
-            <b>{row['Name']}</b><br>
-            Rating: {row['Rating']}<br>
-            Reviews: {row['Number of Reviews']}<br>
-            Type: {row['Search Query']}
-            """
-            folium.Marker(
-                [row['Latitude'], row['Longitude']],
-                popup=popup_html,
-                tooltip=row['Name']
-            ).add_to(m)
+        # Map centered on the average location of filtered results
+        m = mapviews.render_map(filtered_df, zoom_start=13)
 
         st_folium(m, width=1000, height=600)
     else:
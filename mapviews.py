@@ -0,0 +1,43 @@
+# Marker data columns, in the order POPUP_CALLBACK reads them
+MARKER_COLS = ['Latitude', 'Longitude', 'Name', 'Rating', 'Number of Reviews', 'Search Query']
+
+# Popups are built in the browser from each data row instead of per-row HTML in Python
+POPUP_CALLBACK = """\
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(
+        '<div style="width:200px"><b>' + row[2] + '</b><br>' +
+        '⭐ ' + row[3] + ' (' + row[4] + ')<br>' +
+        '<i>' + row[5] + '</i></div>'
+    );
+    marker.bindTooltip(String(row[2]));
+    return marker;
+};
+"""
+
+def render_map(df, limit=None, zoom_start=12):
+    """Return a folium.Map of df's POIs as one clustered layer (first `limit` rows if set)."""
+    # Imported here so menu navigation doesn't pay for folium until a map is drawn
+    import folium
+    from folium.plugins import FastMarkerCluster
+
+    avg_lat = df['Latitude'].mean()
+    avg_lon = df['Longitude'].mean()
+    m = folium.Map(location=[avg_lat, avg_lon], zoom_start=zoom_start)
+
+    cols = df[MARKER_COLS]
+    if limit is not None:
+        cols = cols.head(limit)
+    if cols['Rating'].dtype.kind == 'f':
+        # float32 ratings would otherwise show up as 4.699999809... in popups
+        cols = cols.assign(Rating=cols['Rating'].astype('float64').round(1))
+    cols = cols.astype(object)
+    data = cols.where(cols.notna(), '').to_numpy().tolist()
+    FastMarkerCluster(
+        data=data,
+        callback=POPUP_CALLBACK,
+        options={"chunkedLoading": True, "disableClusteringAtZoom": 16}
+    ).add_to(m)
+    return m
+
+# auto-commit
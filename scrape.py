@@ -5,23 +5,37 @@ maps_grid_poi_scrape.py
 Stable-ish Google Maps grid POI scraper using URL-based navigation.
 
 Notes:
- - Requires: pip install selenium beautifulsoup4
+ - Requires: pip install selenium lxml
  - Selenium >= 4.6 recommended (Selenium Manager auto-manages chromedriver)
  - This is for demo / research only. Respect Terms of Service & robots.txt.
 """
 
 import time
+import base64
+import io
 import csv
 import os
 import re
 import math
+import threading
+from functools import partial
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
 from math import radians, sin, cos, sqrt, atan2
 from datetime import datetime
 from urllib.parse import quote_plus
 
+import numpy as np
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
+from lxml import etree
+
+try:
+    # optional: perceptual-hash dedupe of near-identical screenshots
+    import imagehash
+    from PIL import Image
+except ImportError:
+    imagehash = None
 
 # ---------------------------
 # Config (edit these)
@@ -31,9 +45,12 @@ COMBINED_CSV = os.path.join(OUTPUT_DIR, "dataset.csv")
 PER_CATEGORY_DIR = os.path.join(OUTPUT_DIR, "categories")
 
 TAKE_SCREENSHOTS = False   # optional: set True if you want screenshots
+SCREENSHOT_QUALITY = 70   # jpeg quality for CDP captures
+PHASH_MIN_DISTANCE = 6    # skip screenshots this close (phash) to a saved one
 HEADLESS = False          # headless mode
 PAUSE_AFTER_LOAD = 3      # seconds to wait after loading a search URL
 ZOOM = 15                 # google maps zoom level
+NUM_WORKERS = 4           # parallel chrome drivers (forced headless when > 1)
 
 # Grid area / steps (in degrees)
 START_LAT = 38.8363592557036
@@ -62,14 +79,40 @@ def ensure_dirs():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     os.makedirs(PER_CATEGORY_DIR, exist_ok=True)
 
-def write_rows_to_csv(path, rows, header=None):
-    first_time = not os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
+def get_csv_writer(stack, writers, path, header=None):
+    """Return the run's csv.writer for path, opening the file only once."""
+    writer = writers.get(path)
+    if writer is None:
+        f = stack.enter_context(open(path, "a", newline="", buffering=1 << 16, encoding="utf-8"))
         writer = csv.writer(f)
-        if header and first_time:
+        if header and os.stat(path).st_size == 0:
             writer.writerow(header)
-        for r in rows:
-            writer.writerow(r)
+        writers[path] = writer
+    return writer
+
+_AT_COORD_RE = re.compile(r'@(-?\d+\.\d+),(-?\d+\.\d+)')
+_FLOAT_RE = re.compile(r'-?\d+\.\d+')
+_PLACE_ID_RE = re.compile(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)')
+
+_seen_lock = threading.Lock()
+
+def place_id_from_url(url: str):
+    """Stable place id (the !1s0x...:0x... token of a /place/ link), or None."""
+    m = _PLACE_ID_RE.search(url)
+    return m.group(1) if m else None
+
+def filter_unseen(pois, query, seen):
+    """Drop POIs already emitted for this query, updating seen in place (thread-safe)."""
+    fresh = []
+    with _seen_lock:
+        for p in pois:
+            pid = place_id_from_url(p.get('link', ''))
+            if pid is not None:
+                if (pid, query) in seen:
+                    continue
+                seen.add((pid, query))
+            fresh.append(p)
+    return fresh
 
 def extract_coordinates_from_url(url: str):
     """
@@ -77,20 +120,16 @@ def extract_coordinates_from_url(url: str):
     Tries patterns like: /@lat,lon,zoom or ?q=lat,lon
     Returns (lat, lon) or (None, None)
     """
-    try:
-        # pattern @lat,lon,... (most common)
-        m = re.search(r'@(-?\d+\.\d+),(-?\d+\.\d+)', url)
-        if m:
-            return float(m.group(1)), float(m.group(2))
+    # pattern @lat,lon,... (most common)
+    m = _AT_COORD_RE.search(url)
+    if m:
+        return float(m.group(1)), float(m.group(2))
 
-        # pattern /search/.../.../data=!3m1!4b1!4m5!3m4! etc - fallback: find first two floats
-        floats = re.findall(r'(-?\d+\.\d+)', url)
-        if len(floats) >= 2:
-            # choose first two as fallback (not ideal but better than nothing)
-            return float(floats[0]), float(floats[1])
-
-    except Exception as e:
-        print("coord parse error:", e)
+    # pattern /search/.../.../data=!3m1!4b1!4m5!3m4! etc - fallback: find first two floats
+    floats = _FLOAT_RE.findall(url)
+    if len(floats) >= 2:
+        # choose first two as fallback (not ideal but better than nothing)
+        return float(floats[0]), float(floats[1])
 
     return None, None
 
@@ -105,33 +144,101 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     c = 2 * atan2(sqrt(a), sqrt(1-a))
     return R * c
 
+def haversine_vec(lat1, lon1, lat2, lon2):
+    """Vectorized haversine_distance over NumPy arrays (scalars broadcast)."""
+    R = 6371000  # meters
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(np.subtract(lat2, lat1))
+    dlambda = np.radians(np.subtract(lon2, lon1))
+
+    a = np.sin(dphi/2)**2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    return R * c
+
+# ---------------------------
+# Screenshots
+# ---------------------------
+# Encoding/writing happens off the scrape threads; pending saves are joined at exit
+_screenshot_pool = ThreadPoolExecutor(max_workers=2)
+_saved_hashes = []
+_saved_hashes_lock = threading.Lock()
+
+def _write_screenshot(path, b64_data):
+    try:
+        data = base64.b64decode(b64_data)
+        if imagehash is not None:
+            h = imagehash.phash(Image.open(io.BytesIO(data)))
+            with _saved_hashes_lock:
+                if any(h - seen < PHASH_MIN_DISTANCE for seen in _saved_hashes):
+                    return
+                _saved_hashes.append(h)
+        with open(path, "wb") as f:
+            f.write(data)
+    except Exception as e:
+        print("Screenshot failed:", e)
+
+def save_screenshot_async(driver, path):
+    """Capture the viewport as JPEG via CDP and queue it for writing."""
+    shot = driver.execute_cdp_cmd("Page.captureScreenshot", {
+        "format": "jpeg",
+        "quality": SCREENSHOT_QUALITY,
+        "captureBeyondViewport": False
+    })
+    _screenshot_pool.submit(_write_screenshot, path, shot["data"])
+
 # ---------------------------
 # Scraping logic
 # ---------------------------
+# subcategory names are loop-invariant across the grid; encode them once
+_ENCODED_QUERIES = {sc: quote_plus(sc) for subcats in CATEGORIES.values() for sc in subcats}
+
 def build_search_url(query, lat, lon, zoom=ZOOM):
     """Build a stable URL that centers the map at lat,lon and runs the search."""
-    # encode query for URL path
-    q = quote_plus(query)
+    # encode query for URL path (precomputed for configured subcategories)
+    q = _ENCODED_QUERIES.get(query) or quote_plus(query)
     # use the /search/ path and center by @lat,lon,zoom to keep it stable
     return f"https://www.google.com/maps/search/{q}/@{lat},{lon},{zoom}z"
 
+def _has_class(cls):
+    """XPath predicate matching one token of a (possibly multi-valued) class attribute."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+_CARDS_XP = etree.XPath(f"//div[{_has_class('Nv2PK')}]")
+_PLACE_LINKS_XP = etree.XPath("//a[@href][contains(@href, '/place/') or contains(@href, '/maps')]")
+_LINK_XP = etree.XPath(".//a/@href")
+_RATING_XPS = (etree.XPath(f".//span[{_has_class('MW4etd')}]"), etree.XPath(".//span[@aria-label]"))
+_REVIEWS_XPS = (etree.XPath(f".//span[{_has_class('UY7F9')}]"), etree.XPath(".//span[@aria-hidden]"))
+_HEADING_XP = etree.XPath("(.//div | .//h3)[1]")
+
+def _text(node):
+    """Element text with each piece stripped, like BeautifulSoup's get_text(strip=True)."""
+    return "".join(t.strip() for t in node.itertext())
+
+def _first(card, xpaths):
+    """First match of the first XPath in the fallback chain that matches anything."""
+    for xp in xpaths:
+        found = xp(card)
+        if found:
+            return found[0]
+    return None
+
 def parse_left_panel_pois(page_source, max_results=NUM_RESULTS_PER_SEARCH):
     """
     Parse POI items from the left result panel.
     Returns list of dicts: {name, rating, reviews, link}
     """
-    soup = BeautifulSoup(page_source, "html.parser")
+    tree = etree.HTML(page_source)
+    if tree is None:
+        return []
 
     # The left cards often have class 'Nv2PK' (dynamic), but we'll look for common structures:
     candidates = []
 
     # Try specific known card class
-    cards = soup.find_all('div', class_='Nv2PK')
+    cards = _CARDS_XP(tree)
     if not cards:
-        # fallback: find anchor elements that look like place links
-        cards = soup.find_all('a', href=True)
-        # filter anchors that include '/place/' or '/maps' path and have text
-        cards = [a for a in cards if ('/place/' in a['href'] or '/maps' in a['href']) and a.get_text(strip=True)]
+        # fallback: anchors that include '/place/' or '/maps' path and have text
+        cards = [a for a in _PLACE_LINKS_XP(tree) if _text(a)]
 
     for card in cards:
         if len(candidates) >= max_results:
@@ -139,22 +246,22 @@ def parse_left_panel_pois(page_source, max_results=NUM_RESULTS_PER_SEARCH):
 
         try:
             # attempt to get name and link
-            if card.name == 'a' and card.get('href'):
-                link = card['href']
-                name = card.get_text(strip=True)[:200]
+            if card.tag == 'a' and card.get('href'):
+                link = card.get('href')
+                name = _text(card)[:200]
             else:
-                link_tag = card.find('a', href=True)
-                link = link_tag['href'] if link_tag else ''
+                links = _LINK_XP(card)
+                link = links[0] if links else ''
                 # name often in div with role heading inside the card
-                name_tag = card.find(['div', 'h3'], recursive=True)
-                name = name_tag.get_text(strip=True) if name_tag else card.get_text(strip=True)[:200]
+                name_tag = _first(card, (_HEADING_XP,))
+                name = _text(name_tag) if name_tag is not None else _text(card)[:200]
 
             # rating and reviews - best-effort
-            rating_tag = card.find('span', class_='MW4etd') or card.find('span', {'aria-label': True})
-            rating = rating_tag.get_text(strip=True) if rating_tag else ''
+            rating_tag = _first(card, _RATING_XPS)
+            rating = _text(rating_tag) if rating_tag is not None else ''
 
-            reviews_tag = card.find('span', class_='UY7F9') or card.find('span', {'aria-hidden': True})
-            reviews = reviews_tag.get_text(strip=True) if reviews_tag else ''
+            reviews_tag = _first(card, _REVIEWS_XPS)
+            reviews = _text(reviews_tag) if reviews_tag is not None else ''
 
             candidates.append({
                 "name": name,
@@ -167,23 +274,55 @@ def parse_left_panel_pois(page_source, max_results=NUM_RESULTS_PER_SEARCH):
 
     return candidates
 
-def scrape_for_query(driver, query, lat, lon, max_results=NUM_RESULTS_PER_SEARCH, take_screenshot=False, row_idx=None, col_idx=None):
+# in-browser version of parse_left_panel_pois for the card layout
+_EXTRACT_CARDS_JS = """
+// Join stripped text nodes, matching lxml _text (bs4 get_text(strip=True))
+const text = el => {
+    if (!el) return '';
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    let out = '';
+    while (walker.nextNode()) out += walker.currentNode.nodeValue.trim();
+    return out;
+};
+return Array.from(document.querySelectorAll('div.Nv2PK')).slice(0, arguments[0]).map(c => {
+    const a = c.querySelector('a[href]');
+    return {
+        name: text(c.querySelector('div, h3')) || text(c).slice(0, 200),
+        link: a ? a.getAttribute('href') : '',
+        rating: text(c.querySelector('span.MW4etd') || c.querySelector('span[aria-label]')),
+        reviews: text(c.querySelector('span.UY7F9') || c.querySelector('span[aria-hidden]'))
+    };
+});
+"""
+
+def scrape_for_query(driver, query, lat, lon, max_results=NUM_RESULTS_PER_SEARCH, take_screenshot=False, row_idx=None, col_idx=None, seen=None):
     url = build_search_url(query, lat, lon)
     driver.get(url)
     time.sleep(PAUSE_AFTER_LOAD)
 
-    page_source = driver.page_source
-    pois = parse_left_panel_pois(page_source, max_results=max_results)
+    # extract from the live DOM; fall back to parsing page_source (e.g. no card containers)
+    pois = driver.execute_script(_EXTRACT_CARDS_JS, max_results)
+    if not pois:
+        pois = parse_left_panel_pois(driver.page_source, max_results=max_results)
+    if seen is not None:
+        # neighbouring cells overlap heavily; keep only POIs not yet saved for this query
+        pois = filter_unseen(pois, query, seen)
 
-    rows = []
-    for idx, p in enumerate(pois):
+    coords = []
+    for p in pois:
         plat, plon = extract_coordinates_from_url(p.get('link', ''))
         if (plat is None) or (plon is None):
             # fallback: sometimes link is relative; try to find coordinates in page (not robust)
             plat, plon = lat, lon
+        coords.append((plat, plon))
 
-        dist_m = haversine_distance(lat, lon, plat, plon) if (plat and plon) else None
+    # one vectorized call for every POI in the panel
+    plats = np.array([c[0] for c in coords], dtype=float)
+    plons = np.array([c[1] for c in coords], dtype=float)
+    dists = haversine_vec(lat, lon, plats, plons)
 
+    rows = []
+    for p, (plat, plon), dist_m in zip(pois, coords, dists):
         rows.append([
             p.get('name', 'N/A'),
             p.get('rating', ''),
@@ -194,70 +333,130 @@ def scrape_for_query(driver, query, lat, lon, max_results=NUM_RESULTS_PER_SEARCH
             datetime.utcnow().isoformat(),
             f"{lat:.6f}",
             f"{lon:.6f}",
-            f"{dist_m:.1f}" if dist_m is not None else ""
+            f"{dist_m:.1f}"
         ])
 
     # optional screenshot
     if take_screenshot:
         try:
-            fname = f"shot_r{row_idx}_c{col_idx}_{lat:.6f}_{lon:.6f}.png"
+            fname = f"shot_r{row_idx}_c{col_idx}_{query.replace(' ', '_')}_{lat:.6f}_{lon:.6f}.jpg"
             path = os.path.join(PER_CATEGORY_DIR, fname)
-            driver.save_screenshot(path)
+            save_screenshot_async(driver, path)
         except Exception as e:
             print("Screenshot failed:", e)
 
     return rows
 
 # ---------------------------
-# Grid traversal
+# Worker drivers
 # ---------------------------
-def run_grid_scrape(driver,
-                    start_lat, start_lon, end_lat, end_lon,
-                    step_lat=STEP_LAT, step_lon=STEP_LON,
-                    categories=CATEGORIES):
-    ensure_dirs()
-    # prepare combined CSV header
-    header = ["Name", "Rating", "Number of Reviews", "Latitude", "Longitude", "Search Query", "UTC_Time", "CenterLat", "CenterLon", "Distance_m"]
-    # ensure combined CSV exists with header
-    if not os.path.exists(COMBINED_CSV):
-        write_rows_to_csv(COMBINED_CSV, [], header=header)
+_thread_local = threading.local()
+_drivers = []
+_drivers_lock = threading.Lock()
 
+def make_driver(num_workers=NUM_WORKERS):
+    chrome_opts = Options()
+    if HEADLESS or num_workers > 1:
+        chrome_opts.add_argument("--headless=new")
+        chrome_opts.add_argument("--window-size=1920,1080")
+    else:
+        chrome_opts.add_argument("--start-maximized")
+    return webdriver.Chrome(options=chrome_opts)  # Selenium Manager should auto-handle chromedriver
+
+def get_thread_driver(num_workers=NUM_WORKERS):
+    """Return the calling thread's driver; each worker opens maps once and reuses it."""
+    driver = getattr(_thread_local, "driver", None)
+    if driver is None:
+        driver = make_driver(num_workers)
+        driver.get("https://www.google.com/maps")
+        time.sleep(2)
+        _thread_local.driver = driver
+        with _drivers_lock:
+            _drivers.append(driver)
+    return driver
+
+def quit_drivers():
+    with _drivers_lock:
+        for driver in _drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        _drivers.clear()
+
+# ---------------------------
+# Grid traversal
+# ---------------------------
+def build_tasks(start_lat, start_lon, end_lat, end_lon,
+                step_lat=STEP_LAT, step_lon=STEP_LON,
+                categories=CATEGORIES):
+    """Flatten the grid into (row, col, lat, lon, cat, subcat) tasks."""
+    tasks = []
     lat = start_lat
     row = 0
     while lat <= end_lat + 1e-12:
         lon = start_lon
         col = 0
         while lon <= end_lon + 1e-12:
-            print(f"\n--- Grid point row {row} col {col} -> center ({lat:.6f}, {lon:.6f}) ---")
             for cat, subcats in categories.items():
-                cat_dir = os.path.join(PER_CATEGORY_DIR, cat.replace(" ", "_"))
-                os.makedirs(cat_dir, exist_ok=True)
-
                 for subcat in subcats:
-                    try:
-                        rows = scrape_for_query(driver, subcat, lat, lon, max_results=NUM_RESULTS_PER_SEARCH,
-                                                take_screenshot=TAKE_SCREENSHOTS, row_idx=row, col_idx=col)
-                        if rows:
-                            # save per-subcategory
-                            filename = os.path.join(cat_dir, f"{subcat.replace(' ','_')}.csv")
-                            write_rows_to_csv(filename, rows, header=header)
-
-                            # append to combined
-                            write_rows_to_csv(COMBINED_CSV, rows)
-                            print(f"Saved {len(rows)} results for '{subcat}'")
-                        else:
-                            print(f"No results parsed for '{subcat}' at {lat:.6f},{lon:.6f}")
-                    except Exception as e:
-                        print(f"Error scraping '{subcat}' at {lat},{lon}: {e}")
-
-                    # small pause between searches to be polite
-                    time.sleep(1)
-
+                    tasks.append((row, col, lat, lon, cat, subcat))
             lon += step_lon
             col += 1
 
         lat += step_lat
         row += 1
+    return tasks
+
+def scrape_task(task, seen=None, num_workers=NUM_WORKERS):
+    row, col, lat, lon, cat, subcat = task
+    rows = []
+    try:
+        rows = scrape_for_query(get_thread_driver(num_workers), subcat, lat, lon, max_results=NUM_RESULTS_PER_SEARCH,
+                                take_screenshot=TAKE_SCREENSHOTS, row_idx=row, col_idx=col, seen=seen)
+    except Exception as e:
+        print(f"Error scraping '{subcat}' at {lat},{lon}: {e}")
+
+    # small pause between searches to be polite
+    time.sleep(1)
+    return task, rows
+
+def run_grid_scrape(start_lat, start_lon, end_lat, end_lon,
+                    step_lat=STEP_LAT, step_lon=STEP_LON,
+                    categories=CATEGORIES, num_workers=NUM_WORKERS):
+    ensure_dirs()
+    # prepare combined CSV header
+    header = ["Name", "Rating", "Number of Reviews", "Latitude", "Longitude", "Search Query", "UTC_Time", "CenterLat", "CenterLon", "Distance_m"]
+
+    cat_dirs = {}
+    for cat in categories:
+        cat_dirs[cat] = os.path.join(PER_CATEGORY_DIR, cat.replace(" ", "_"))
+        os.makedirs(cat_dirs[cat], exist_ok=True)
+
+    tasks = build_tasks(start_lat, start_lon, end_lat, end_lon,
+                        step_lat=step_lat, step_lon=step_lon, categories=categories)
+    print(f"{len(tasks)} searches queued across {num_workers} workers")
+
+    # workers only scrape and return rows; CSV writes stay on this thread,
+    # each output file is opened once for the whole run
+    writers = {}
+    seen = set()
+    try:
+        with ExitStack() as stack, ThreadPoolExecutor(max_workers=num_workers) as executor:
+            combined = get_csv_writer(stack, writers, COMBINED_CSV, header=header)
+            for (row, col, lat, lon, cat, subcat), rows in executor.map(partial(scrape_task, seen=seen, num_workers=num_workers), tasks):
+                if rows:
+                    # save per-subcategory
+                    filename = os.path.join(cat_dirs[cat], f"{subcat.replace(' ','_')}.csv")
+                    get_csv_writer(stack, writers, filename, header=header).writerows(rows)
+
+                    # append to combined
+                    combined.writerows(rows)
+                    print(f"Saved {len(rows)} results for '{subcat}' at row {row} col {col}")
+                else:
+                    print(f"No results parsed for '{subcat}' at {lat:.6f},{lon:.6f}")
+    finally:
+        quit_drivers()
 
 # ---------------------------
 # Main entrypoint
@@ -266,34 +465,17 @@ def main():
     print("Starting grid POI scrape...")
     ensure_dirs()
 
-    chrome_opts = Options()
-    if HEADLESS:
-        chrome_opts.add_argument("--headless=new")
-        chrome_opts.add_argument("--window-size=1920,1080")
-    else:
-        chrome_opts.add_argument("--start-maximized")
-
-    driver = webdriver.Chrome(options=chrome_opts)  # Selenium Manager should auto-handle chromedriver
-
-    try:
-        # open maps once
-        driver.get("https://www.google.com/maps")
-        time.sleep(2)
-
-        run_grid_scrape(
-            driver,
-            start_lat=START_LAT,
-            start_lon=START_LON,
-            end_lat=END_LAT,
-            end_lon=END_LON,
-            step_lat=STEP_LAT,
-            step_lon=STEP_LON,
-            categories=CATEGORIES
-        )
-
-        print("Grid scraping finished.")
-    finally:
-        driver.quit()
+    run_grid_scrape(
+        start_lat=START_LAT,
+        start_lon=START_LON,
+        end_lat=END_LAT,
+        end_lon=END_LON,
+        step_lat=STEP_LAT,
+        step_lon=STEP_LON,
+        categories=CATEGORIES
+    )
+
+    print("Grid scraping finished.")
 
 if __name__ == "__main__":
     main()
@@ -1,91 +1,190 @@
 import time
+import base64
 import os
+import atexit
+import threading
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import WebDriverException
+from lxml import etree
 import config
 import utils
 
+def _has_class(cls):
+    """XPath predicate matching one token of a (possibly multi-valued) class attribute."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+_PLACE_LINKS_XP = etree.XPath("//a[@href][contains(@href, '/place/') or contains(@href, '/maps')]")
+_LINK_XP = etree.XPath(".//a/@href")
+_RATING_XPS = (etree.XPath(f".//span[{_has_class('MW4etd')}]"), etree.XPath(".//span[@aria-label]"))
+_REVIEWS_XPS = (etree.XPath(f".//span[{_has_class('UY7F9')}]"), etree.XPath(".//span[@aria-hidden]"))
+_NAME_XPS = (etree.XPath(f".//div[{_has_class('qBF1Pd')}]"), etree.XPath(f".//div[{_has_class('fontHeadlineSmall')}]"))
+
+def _text(node):
+    """Element text with each piece stripped, like BeautifulSoup's get_text(strip=True)."""
+    return "".join(t.strip() for t in node.itertext())
+
+def _first_text(node):
+    """First non-blank stripped text piece, without joining the whole subtree."""
+    return next((t.strip() for t in node.itertext() if t.strip()), '')
+
+def _first(card, xpaths):
+    """First match of the first XPath in the fallback chain that matches anything."""
+    for xp in xpaths:
+        found = xp(card)
+        if found:
+            return found[0]
+    return None
+
+_FEED_CHUNK = 1 << 16
+
+def _iter_cards(page_source):
+    """
+    Pull-parse page_source and yield each Nv2PK card div as soon as it closes,
+    so the rest of the document is never parsed once the caller stops.
+    """
+    parser = etree.HTMLPullParser(events=('end',), tag='div')
+    for start in range(0, len(page_source), _FEED_CHUNK):
+        parser.feed(page_source[start:start + _FEED_CHUNK])
+        for _, div in parser.read_events():
+            if 'Nv2PK' in (div.get('class') or '').split():
+                yield div
+                div.clear()  # Release the card's subtree once the caller is done with it
+
 def parse_left_panel_pois(page_source, max_results=config.NUM_RESULTS_PER_SEARCH):
     """
     Parse POI items from the left result panel.
     """
-    soup = BeautifulSoup(page_source, "html.parser")
     candidates = []
 
-    # 1. Try finding card containers
-    cards = soup.find_all('div', class_='Nv2PK')
+    # 1. Try finding card containers (streamed, so parsing stops at max_results)
+    cards = _iter_cards(page_source)
+    first = next(cards, None)
     
     # 2. Fallback: Find links that look like places
-    if not cards:
-        cards = [a for a in soup.find_all('a', href=True) 
-                 if ('/place/' in a['href'] or '/maps' in a['href']) and a.get_text(strip=True)]
+    if first is None:
+        tree = etree.HTML(page_source) if page_source else None
+        if tree is None:
+            return []
+        cards = (a for a in _PLACE_LINKS_XP(tree) if _text(a))
+    else:
+        cards = chain([first], cards)
+
+    if max_results <= 0:
+        return candidates
 
     for card in cards:
-        if len(candidates) >= max_results:
-            break
+        # Extract Link
+        link = card.get('href', '') if card.tag == 'a' else ''
+        if not link:
+            links = _LINK_XP(card)
+            link = links[0] if links else ''
 
-        try:
-            # Extract Link
-            if card.name == 'a' and card.get('href'):
-                link = card['href']
-            else:
-                link_tag = card.find('a', href=True)
-                link = link_tag['href'] if link_tag else ''
-
-            # Extract Name (Robust)
-            name = None
-            if card.get('aria-label'):
-                name = card['aria-label']
-            elif card.name == 'a' and card.get('aria-label'):
-                name = card['aria-label']
-            
-            if not name:
-                name_tag = card.find('div', class_='qBF1Pd') or card.find('div', class_='fontHeadlineSmall')
-                if name_tag:
-                    name = name_tag.get_text(strip=True)
-            
-            if not name:
-                name = card.get_text(strip=True)[:200]
-
-            # Extract Rating
-            rating_tag = card.find('span', class_='MW4etd') or card.find('span', {'aria-label': True})
-            rating = rating_tag.get_text(strip=True) if rating_tag else ''
-
-            # Extract Reviews
-            reviews_tag = card.find('span', class_='UY7F9') or card.find('span', {'aria-hidden': True})
-            raw_reviews = reviews_tag.get_text(strip=True) if reviews_tag else ''
-            reviews = raw_reviews.strip('()')
-
-            if name:
-                candidates.append({
-                    "name": name,
-                    "link": link,
-                    "rating": rating,
-                    "reviews": reviews
-                })
-        except Exception:
-            continue
+        # Extract Name (Robust): aria-label, then headline div, then first text piece
+        name = card.get('aria-label')
+        if not name:
+            name_tag = _first(card, _NAME_XPS)
+            name = (_text(name_tag) if name_tag is not None else '') or _first_text(card)[:200]
+
+        # Extract Rating
+        rating_tag = _first(card, _RATING_XPS)
+        rating = _text(rating_tag) if rating_tag is not None else ''
+
+        # Extract Reviews
+        reviews_tag = _first(card, _REVIEWS_XPS)
+        raw_reviews = _text(reviews_tag) if reviews_tag is not None else ''
+        reviews = raw_reviews.strip('()')
+
+        if name:
+            candidates.append({
+                "name": name,
+                "link": link,
+                "rating": rating,
+                "reviews": reviews
+            })
+            # Stop here, before the stream parses past this card
+            if len(candidates) >= max_results:
+                break
 
     return candidates
 
+_RESULTS_STATE_JS = ("window.__scraperStale ? 'stale' : document.querySelector("
+                     "'div.Nv2PK, div.section-no-result-message') ? 'ready' : 'loading'")
+
+def _cdp_eval(driver, expression):
+    """Evaluate a JS expression in the page over CDP and return its value."""
+    res = driver.execute_cdp_cmd("Runtime.evaluate", {"expression": expression, "returnByValue": True})
+    return res.get("result", {}).get("value")
+
 def scrape_for_query(driver, query, lat, lon, max_results=config.NUM_RESULTS_PER_SEARCH, take_screenshot=False, row_idx=None, col_idx=None):
     url = utils.build_search_url(query, lat, lon)
-    driver.get(url)
-    time.sleep(config.PAUSE_AFTER_LOAD)
+    # Navigate and read the DOM over CDP instead of driver.get + page_source.
+    # The flag marks the old document so its cards are not mistaken for new results.
+    _cdp_eval(driver, "window.__scraperStale = true")
+    nav = driver.execute_cdp_cmd("Page.navigate", {"url": url})
+    if nav.get("errorText"):
+        print(f"Navigation failed for '{query}': {nav['errorText']}")
+        return []
+    # Wait only until results (or the no-results notice) render, not a fixed pause
+    deadline = time.monotonic() + config.MAX_WAIT
+    while True:
+        try:
+            state = _cdp_eval(driver, _RESULTS_STATE_JS)
+        except WebDriverException:
+            state = None  # Old document torn down mid-evaluate; the new one is on its way
+        if state == 'ready' or time.monotonic() >= deadline:
+            break
+        time.sleep(0.1)
+    if state in ('stale', None):
+        # Navigation never committed; the DOM still holds the previous query's cards
+        print(f"Timed out loading '{query}' at ({lat:.6f}, {lon:.6f})")
+        return []
 
-    page_source = driver.page_source
+    page_source = _cdp_eval(driver, "document.body ? document.body.outerHTML : ''") or ''
     pois = parse_left_panel_pois(page_source, max_results=max_results)
+    rows = build_rows(pois, query, lat, lon)
 
-    rows = []
+    # Screenshot handling (explicit Request)
+    if take_screenshot:
+        try:
+            fname = f"shot_r{row_idx}_c{col_idx}_{query.replace(' ', '_')}_{lat:.6f}_{lon:.6f}.jpg"
+            path = os.path.join(config.PER_CATEGORY_DIR, fname)
+            # JPEG straight from CDP: no lossless PNG encode, far smaller files
+            shot = driver.execute_cdp_cmd("Page.captureScreenshot", {
+                "format": "jpeg",
+                "quality": config.SCREENSHOT_QUALITY
+            })
+            with open(path, "wb") as f:
+                f.write(base64.b64decode(shot["data"]))
+        except Exception as e:
+            print(f"Screenshot failed: {e}")
+
+    return rows
+
+def build_rows(pois, query, lat, lon):
+    """Turn parsed POIs into CSV rows relative to the search center."""
+    plats, plons = [], []
     for p in pois:
         plat, plon = utils.extract_coordinates_from_url(p.get('link', ''))
         
         if (plat is None) or (plon is None):
             plat, plon = lat, lon
+        plats.append(plat)
+        plons.append(plon)
 
-        dist_m = utils.haversine_distance(lat, lon, plat, plon) if (plat and plon) else None
+    # POIs sit within one grid step of the center, so the flat-earth distance is enough
+    cos_lat0 = np.cos(np.radians(lat))
+    dists = utils.equirectangular_distance(lat, lon, np.array(plats, dtype=float), np.array(plons, dtype=float), cos_lat0)
 
+    # Center columns are identical for every row of this query
+    center_lat_s = f"{lat:.6f}"
+    center_lon_s = f"{lon:.6f}"
+
+    rows = []
+    for p, plat, plon, dist_m in zip(pois, plats, plons, dists):
         rows.append([
             p.get('name', 'N/A'),
             p.get('rating', ''),
@@ -93,87 +192,115 @@ def scrape_for_query(driver, query, lat, lon, max_results=config.NUM_RESULTS_PER
             f"{plat:.6f}" if plat else 'N/A',
             f"{plon:.6f}" if plon else 'N/A',
             query,
-            f"{lat:.6f}",
-            f"{lon:.6f}",
-            f"{dist_m:.1f}" if dist_m is not None else ""
+            center_lat_s,
+            center_lon_s,
+            f"{dist_m:.1f}"
         ])
+    return rows
 
-    # Screenshot handling (explicit Request)
-    if take_screenshot:
-        try:
-            fname = f"shot_r{row_idx}_c{col_idx}_{lat:.6f}_{lon:.6f}.png"
-            path = os.path.join(config.PER_CATEGORY_DIR, fname)
-            driver.save_screenshot(path)
-        except Exception as e:
-            print(f"Screenshot failed: {e}")
+_thread_local = threading.local()
+_drivers = []
+_drivers_lock = threading.Lock()
 
-    return rows
+def make_driver():
+    chrome_opts = Options()
+    if config.HEADLESS or config.NUM_WORKERS > 1:
+        chrome_opts.add_argument("--headless=new")
+    # Skip map tiles/photos and background work; JS stays on since Maps renders results with it
+    chrome_opts.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    for flag in ("--disable-gpu", "--disable-dev-shm-usage", "--no-sandbox",
+                 "--blink-settings=imagesEnabled=false", "--disable-extensions",
+                 "--disable-background-networking", "--window-size=1200,900"):
+        chrome_opts.add_argument(flag)
+    return webdriver.Chrome(options=chrome_opts)
+
+def get_thread_driver():
+    """Return this thread's driver, creating it on first use."""
+    driver = getattr(_thread_local, "driver", None)
+    if driver is None:
+        driver = make_driver()
+        driver.get("https://www.google.com/maps")
+        time.sleep(2)
+        _thread_local.driver = driver
+        with _drivers_lock:
+            _drivers.append(driver)
+    return driver
+
+def quit_drivers():
+    with _drivers_lock:
+        for driver in _drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        _drivers.clear()
+
+def _grid_axis(start, end, step):
+    """Grid coordinates from start in whole steps up to end, counted exactly instead of float-stepped."""
+    n = int(np.floor((end - start) / step + 1e-9)) + 1
+    return np.linspace(start, start + (n - 1) * step, n).tolist()
+
+def build_tasks():
+    """Flatten the grid into (row, col, lat, lon, cat, subcat, out_path) tasks."""
+    # Per-subcategory output files are resolved (and their folders created) once, not per cell
+    out_paths = {}
+    for cat, subcats in config.CATEGORIES.items():
+        cat_dir = os.path.join(config.PER_CATEGORY_DIR, cat.replace(" ", "_"))
+        os.makedirs(cat_dir, exist_ok=True)
+        for subcat in subcats:
+            out_paths[cat, subcat] = os.path.join(cat_dir, f"{subcat.replace(' ', '_')}.csv")
+
+    lats = _grid_axis(config.START_LAT, config.END_LAT, config.STEP_LAT)
+    lons = _grid_axis(config.START_LON, config.END_LON, config.STEP_LON)
+    return [(row, col, lat, lon, cat, subcat, out_path)
+            for row, lat in enumerate(lats)
+            for col, lon in enumerate(lons)
+            for (cat, subcat), out_path in out_paths.items()]
+
+def scrape_task(task):
+    row, col, lat, lon, cat, subcat, _ = task
+    print(f" Grid ({row}, {col}) Searching: {subcat}")
+    rows = scrape_for_query(
+        get_thread_driver(), subcat, lat, lon,
+        max_results=config.NUM_RESULTS_PER_SEARCH,
+        take_screenshot=config.TAKE_SCREENSHOTS,
+        row_idx=row, col_idx=col
+    )
+    return task, rows
 
 def run_scraper():
     print("Initializing Scraper...")
     utils.ensure_dirs()
     
     header = ["Name", "Rating", "Number of Reviews", "Latitude", "Longitude", "Search Query", "CenterLat", "CenterLon", "Distance_m"]
+    # One long-lived handle per output file; flushed and closed at the end of the run
+    csv_cache = utils.CsvWriterCache()
+    atexit.register(csv_cache.close_all)
     # Initialize combined CSV if needed
-    if not os.path.exists(config.COMBINED_CSV):
-        utils.write_rows_to_csv(config.COMBINED_CSV, [], header=header)
+    csv_cache.get(config.COMBINED_CSV, header=header)
 
-    chrome_opts = Options()
-    if config.HEADLESS:
-        chrome_opts.add_argument("--headless=new")
-    else:
-        chrome_opts.add_argument("--start-maximized")
-
-    driver = webdriver.Chrome(options=chrome_opts)
+    tasks = build_tasks()
+    print(f"Scraping {len(tasks)} queries with {config.NUM_WORKERS} workers...")
 
     try:
-        driver.get("https://www.google.com/maps")
-        time.sleep(2)
+        # Workers only scrape; results are written here, so the cache needs no lock
+        with ThreadPoolExecutor(max_workers=config.NUM_WORKERS) as executor:
+            for (row, col, lat, lon, cat, subcat, out_path), rows in executor.map(scrape_task, tasks):
+                if rows:
+                    # Save subcategory file
+                    csv_cache.writerows(out_path, rows, header=header)
+                    
+                    # Save to combined
+                    csv_cache.writerows(config.COMBINED_CSV, rows)
+                    print(f"  -> Grid ({row}, {col}) {subcat}: Found {len(rows)} POIs")
+                else:
+                    print(f"  -> Grid ({row}, {col}) {subcat}: No results")
 
-        lat = config.START_LAT
-        row = 0
-        while lat <= config.END_LAT + 1e-12:
-            lon = config.START_LON
-            col = 0
-            while lon <= config.END_LON + 1e-12:
-                print(f"\n--- Grid ({row}, {col}) Center: {lat:.6f}, {lon:.6f} ---")
-                
-                for cat, subcats in config.CATEGORIES.items():
-                    cat_dir = os.path.join(config.PER_CATEGORY_DIR, cat.replace(" ", "_"))
-                    os.makedirs(cat_dir, exist_ok=True)
-
-                    for subcat in subcats:
-                        print(f" Searching: {subcat}")
-                        rows = scrape_for_query(
-                            driver, subcat, lat, lon,
-                            max_results=config.NUM_RESULTS_PER_SEARCH,
-                            take_screenshot=config.TAKE_SCREENSHOTS,
-                            row_idx=row, col_idx=col
-                        )
-                        
-                        if rows:
-                            # Save subcategory file
-                            safe_subcat = subcat.replace(' ', '_')
-                            filename = os.path.join(cat_dir, f"{safe_subcat}.csv")
-                            utils.write_rows_to_csv(filename, rows, header=header)
-                            
-                            # Save to combined
-                            utils.write_rows_to_csv(config.COMBINED_CSV, rows)
-                            print(f"  -> Found {len(rows)} POIs")
-                        else:
-                            print("  -> No results")
-                        
-                        time.sleep(1)
-
-                lon += config.STEP_LON
-                col += 1
-            lat += config.STEP_LAT
-            row += 1
-            
         print("Scraping Completed!")
         
     finally:
-        driver.quit()
+        quit_drivers()
+        csv_cache.close_all()
 
 if __name__ == "__main__":
     run_scraper()
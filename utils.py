@@ -3,49 +3,85 @@ import csv
 import re
 from math import radians, sin, cos, sqrt, atan2
 from urllib.parse import quote_plus
-from config import OUTPUT_DIR, PER_CATEGORY_DIR, ZOOM
+import numpy as np
+from config import OUTPUT_DIR, PER_CATEGORY_DIR, ZOOM, CATEGORIES
 
 def ensure_dirs():
     """Ensure output directories exist."""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     os.makedirs(PER_CATEGORY_DIR, exist_ok=True)
 
+# Paths already checked in this process; later appends skip the exists/makedirs syscalls
+_HEADERED = set()
+
 def write_rows_to_csv(path, rows, header=None):
     """Write list of rows to CSV file."""
-    first_time = not os.path.exists(path)
-    # Create parent directory if needed
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    first_time = False
+    if path not in _HEADERED:
+        first_time = not os.path.exists(path)
+        # Create parent directory if needed
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _HEADERED.add(path)
     
-    with open(path, "a", newline="", encoding="utf-8") as f:
+    # 64 KiB: one filesystem-block-sized flush per batch; much larger buffers get slower
+    with open(path, "a", newline="", encoding="utf-8", buffering=1 << 16) as f:
         writer = csv.writer(f)
         if header and first_time:
             writer.writerow(header)
-        for r in rows:
-            writer.writerow(r)
+        writer.writerows(rows)
+
+class CsvWriterCache:
+    """Keep one open (file, csv.writer) per output path for the whole run."""
+
+    def __init__(self):
+        self._writers = {}
+
+    def get(self, path, header=None):
+        """Return (file, writer) for path, opening it on first use."""
+        entry = self._writers.get(path)
+        if entry is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(path, "a", newline="", encoding="utf-8", buffering=1 << 16)
+            writer = csv.writer(f)
+            if header and os.path.getsize(path) == 0:
+                writer.writerow(header)
+            entry = self._writers[path] = (f, writer)
+        return entry
+
+    def writerows(self, path, rows, header=None):
+        self.get(path, header)[1].writerows(rows)
+
+    def close_all(self):
+        for f, _ in self._writers.values():
+            f.close()
+        self._writers.clear()
+
+# Subcategory strings repeat for every grid cell, so encode them once
+_ENCODED_QUERIES = {sc: quote_plus(sc) for subcats in CATEGORIES.values() for sc in subcats}
 
 def build_search_url(query, lat, lon, zoom=ZOOM):
     """Build a stable URL centered at lat,lon."""
-    q = quote_plus(query)
+    q = _ENCODED_QUERIES.get(query) or quote_plus(query)
     # Using /search/ path centered at lat,lon
     return f"https://www.google.com/maps/search/{q}/@{lat},{lon},{zoom}z"
 
+_COORD_RE = re.compile(r'@(-?\d+\.\d+),(-?\d+\.\d+)')
+_FLOAT_RE = re.compile(r'-?\d+\.\d+')
+
 def extract_coordinates_from_url(url: str):
     """
     Robustly extract coordinates from a Google Maps URL.
     Returns (lat, lon) or (None, None).
     """
-    try:
-        # Pattern: @lat,lon,...
-        m = re.search(r'@(-?\d+\.\d+),(-?\d+\.\d+)', url)
-        if m:
-            return float(m.group(1)), float(m.group(2))
-
-        # Fallback: search for any 2 floats in URL
-        floats = re.findall(r'(-?\d+\.\d+)', url)
-        if len(floats) >= 2:
-            return float(floats[0]), float(floats[1])
-    except Exception as e:
-        print(f"Error parsing coordinates: {e}")
+    # Pattern: @lat,lon,... (float() cannot fail on the matched groups)
+    m = _COORD_RE.search(url)
+    if m:
+        return float(m.group(1)), float(m.group(2))
+
+    # Fallback: search for any 2 floats in URL
+    floats = _FLOAT_RE.findall(url)
+    if len(floats) >= 2:
+        return float(floats[0]), float(floats[1])
     
     return None, None
 
@@ -60,4 +96,16 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     c = 2 * atan2(sqrt(a), sqrt(1-a))
     return R * c
 
+def equirectangular_distance(lat1, lon1, lat2, lon2, cos_lat0=None):
+    """
+    Flat-earth distance in meters, accurate to well under a meter within one grid step.
+    Works on scalars or NumPy arrays; pass cos_lat0 = cos(radians(lat1)) to reuse it.
+    """
+    R = 6371000  # Earth radius in meters
+    if cos_lat0 is None:
+        cos_lat0 = np.cos(np.radians(lat1))
+    dx = R * np.radians(np.subtract(lon2, lon1)) * cos_lat0
+    dy = R * np.radians(np.subtract(lat2, lat1))
+    return np.sqrt(dx*dx + dy*dy)
+
 # auto-commit